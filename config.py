@@ -8,6 +8,8 @@ from pathlib import Path
 
 DEFAULT_INPUT_DIR = Path("test_image")
 DEFAULT_OUTPUT_DIR = Path("output_results")
+DEFAULT_CACHE_DIR = Path(".gemini_cache")
+DEAD_LETTER_FILENAME = "dead_letter.txt"
 
 DEFAULT_MODEL = "gemini-3-flash-preview"
 DEFAULT_LABEL_STUDIO_MODEL_VERSION = DEFAULT_MODEL
@@ -19,13 +21,33 @@ DEFAULT_PROMPT = (
     "normalized to a 0-1000 scale. If no fish are detected, return an empty "
     "list []."
 )
+# Wraps DEFAULT_PROMPT (or --prompt) when several images share one request.
+BATCH_PROMPT_TEMPLATE = (
+    "You are given {count} images, labelled Image 0 to Image {last}. Apply "
+    "the following instructions to each image separately: {prompt} "
+    "The response must be a JSON list with exactly one object per image. Each "
+    "object must contain an 'image_index' key with the image number and a "
+    "'detections' key holding the result for that image."
+)
 DEFAULT_CHECK_PROMPT = "Reply with exactly the word OK."
 
-DEFAULT_DELAY_SECONDS = 1.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_MAX_UPLOAD_EDGE = 1024
+DEFAULT_REQUESTS_PER_MINUTE = 60.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_KEEPALIVE_SECONDS = 60.0
 SUPPORTED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
 
 DEFAULT_LOCAL_OUTPUT = Path("tasks.json")
 DEFAULT_GCS_OUTPUT = Path("import_to_ls_gcs.json")
+DEFAULT_READ_WORKERS = 16
+
+DEFAULT_ANNOTATED_FORMAT = "jpeg"
+# Maps --annotated-format to the preview file suffix; "none" skips previews.
+ANNOTATED_IMAGE_FORMATS = {"jpeg": ".jpg", "png": ".png", "none": None}
+ANNOTATED_JPEG_QUALITY = 85
+ANNOTATED_PNG_COMPRESS_LEVEL = 1
 
 BOX_COLOR = "#4FC3F7"
 TEXT_COLOR = "#E1F5FE"
@@ -3,17 +3,22 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+import jsonio
 from config import (
     DEFAULT_GCS_OUTPUT,
     DEFAULT_INPUT_DIR,
     DEFAULT_LABEL_STUDIO_MODEL_VERSION,
     DEFAULT_LOCAL_OUTPUT,
     DEFAULT_OUTPUT_DIR,
+    DEFAULT_READ_WORKERS,
     SUPPORTED_EXTENSIONS,
 )
 
@@ -67,6 +72,12 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_MODEL_VERSION,
         help=f"Model version written into predictions. Default: {DEFAULT_MODEL_VERSION}",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_READ_WORKERS,
+        help=f"Threads used to read detection JSON files. Default: {DEFAULT_READ_WORKERS}",
+    )
     parser.add_argument(
         "--skip-local-output",
         action="store_true",
@@ -82,8 +93,8 @@ def normalize_gcs_prefix(prefix: str) -> str:
 
 def load_detections(json_path: Path) -> list[dict[str, Any]] | None:
     try:
-        payload = json.loads(json_path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError as exc:
+        payload = jsonio.loads_detections(json_path.read_bytes())
+    except jsonio.JSONDecodeError as exc:
         print(f"  - Skipping {json_path.name}: invalid JSON ({exc}).")
         return None
 
@@ -94,7 +105,8 @@ def load_detections(json_path: Path) -> list[dict[str, Any]] | None:
 
 
 def build_ls_results(detections: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    results: list[dict[str, Any]] = []
+    labels: list[str] = []
+    boxes: list[list[int | float]] = []
     for detection in detections:
         box_coords = detection.get("box_2d")
         label = detection.get("label")
@@ -106,32 +118,69 @@ def build_ls_results(detections: list[dict[str, Any]]) -> list[dict[str, Any]]:
             and label
         ):
             continue
-
-        y1_1000, x1_1000, y2_1000, x2_1000 = box_coords
-        results.append(
-            {
-                "from_name": "label",
-                "to_name": "image",
-                "type": "rectanglelabels",
-                "value": {
-                    "x": (x1_1000 / 1000) * 100,
-                    "y": (y1_1000 / 1000) * 100,
-                    "width": ((x2_1000 - x1_1000) / 1000) * 100,
-                    "height": ((y2_1000 - y1_1000) / 1000) * 100,
-                    "rotation": 0,
-                    "rectanglelabels": [label],
-                },
-            }
+        labels.append(label)
+        boxes.append(box_coords)
+
+    if not boxes:
+        return []
+
+    # Boxes are [ymin, xmin, ymax, xmax] on a 0-1000 scale; Label Studio wants
+    # x/y/width/height as percentages, i.e. the same values divided by 10.
+    coords = np.asarray(boxes, dtype=np.float64)
+    percent = np.column_stack(
+        (
+            coords[:, 1],
+            coords[:, 0],
+            coords[:, 3] - coords[:, 1],
+            coords[:, 2] - coords[:, 0],
+        )
+    ) / 10
+
+    return [
+        {
+            "from_name": "label",
+            "to_name": "image",
+            "type": "rectanglelabels",
+            "value": {
+                "x": x,
+                "y": y,
+                "width": width,
+                "height": height,
+                "rotation": 0,
+                "rectanglelabels": [label],
+            },
+        }
+        for label, (x, y, width, height) in zip(labels, percent.tolist())
+    ]
+
+
+def list_json_files(json_dir: Path) -> list[Path]:
+    with os.scandir(json_dir) as entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if entry.name.endswith(".json") and entry.is_file()
         )
-    return results
 
 
-def find_original_image(image_dir: Path, stem: str) -> Path | None:
-    for extension in SUPPORTED_EXTENSIONS:
-        candidate = image_dir / f"{stem}{extension}"
-        if candidate.exists():
-            return candidate
-    return None
+def build_image_index(image_dir: Path) -> dict[str, Path]:
+    """Map image stems to absolute paths, preferring SUPPORTED_EXTENSIONS order.
+
+    The directory is resolved once here so tasks do not resolve each image path.
+    """
+    priority = {extension: rank for rank, extension in enumerate(SUPPORTED_EXTENSIONS)}
+    index: dict[str, Path] = {}
+    ranks: dict[str, int] = {}
+    with os.scandir(image_dir.resolve()) as entries:
+        for entry in entries:
+            stem, extension = os.path.splitext(entry.name)
+            rank = priority.get(extension.lower())
+            if rank is None or not entry.is_file():
+                continue
+            if stem not in ranks or rank < ranks[stem]:
+                ranks[stem] = rank
+                index[stem] = Path(entry.path)
+    return index
 
 
 def build_task(image_reference: str, results: list[dict[str, Any]], model_version: str) -> dict[str, Any]:
@@ -141,9 +190,15 @@ def build_task(image_reference: str, results: list[dict[str, Any]], model_versio
     }
 
 
-def write_json(output_path: Path, payload: list[dict[str, Any]]) -> None:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+def iter_detections(
+    json_files: list[Path], workers: int
+) -> Iterator[tuple[Path, list[dict[str, Any]] | None]]:
+    """Yield detections in input order, reading a bounded window ahead in threads."""
+    window = workers * 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(json_files), window):
+            chunk = json_files[start : start + window]
+            yield from zip(chunk, executor.map(load_detections, chunk))
 
 
 def convert_to_label_studio_format(args: argparse.Namespace) -> int:
@@ -153,43 +208,56 @@ def convert_to_label_studio_format(args: argparse.Namespace) -> int:
     if not args.image_dir.is_dir():
         print(f"Error: image directory '{args.image_dir}' was not found.")
         return 1
+    if args.workers < 1:
+        print("Error: --workers must be at least 1.")
+        return 1
 
-    json_files = sorted(args.json_dir.glob("*.json"))
+    json_files = list_json_files(args.json_dir)
     if not json_files:
         print(f"No JSON files found in '{args.json_dir}'.")
         return 0
 
-    local_tasks: list[dict[str, Any]] = []
-    gcs_tasks: list[dict[str, Any]] = []
     gcs_prefix = normalize_gcs_prefix(args.gcs_prefix)
+    image_index = build_image_index(args.image_dir)
 
     print(f"Starting conversion from '{args.json_dir}'...")
-    for json_path in json_files:
-        detections = load_detections(json_path)
-        if detections is None:
-            continue
-
-        original_image = find_original_image(args.image_dir, json_path.stem)
-        if original_image is None:
-            print(f"  - Skipping {json_path.name}: matching source image not found.")
-            continue
-
-        results = build_ls_results(detections)
-        local_tasks.append(
-            build_task(str(original_image.resolve()), results, args.model_version)
+    with ExitStack() as stack:
+        local_writer = (
+            None
+            if args.skip_local_output
+            else stack.enter_context(jsonio.JsonArrayWriter(args.local_output))
+        )
+        gcs_writer = (
+            stack.enter_context(jsonio.JsonArrayWriter(args.gcs_output))
+            if args.gcs_bucket
+            else None
         )
 
-        if args.gcs_bucket:
-            gcs_reference = f"gs://{args.gcs_bucket}/{gcs_prefix}{original_image.name}"
-            gcs_tasks.append(build_task(gcs_reference, results, args.model_version))
-
-    if not args.skip_local_output:
-        write_json(args.local_output, local_tasks)
-        print(f"  - Wrote {len(local_tasks)} local tasks to '{args.local_output}'.")
-
-    if args.gcs_bucket:
-        write_json(args.gcs_output, gcs_tasks)
-        print(f"  - Wrote {len(gcs_tasks)} GCS tasks to '{args.gcs_output}'.")
+        for json_path, detections in iter_detections(json_files, args.workers):
+            # Empty lists are gemini.py checkpoints for frames with no
+            # detections; they are not exported as tasks.
+            if not detections:
+                continue
+
+            original_image = image_index.get(json_path.stem)
+            if original_image is None:
+                print(f"  - Skipping {json_path.name}: matching source image not found.")
+                continue
+
+            results = build_ls_results(detections)
+            if local_writer is not None:
+                local_writer.write(
+                    build_task(str(original_image), results, args.model_version)
+                )
+            if gcs_writer is not None:
+                gcs_reference = f"gs://{args.gcs_bucket}/{gcs_prefix}{original_image.name}"
+                gcs_writer.write(build_task(gcs_reference, results, args.model_version))
+
+    if local_writer is not None:
+        print(f"  - Wrote {local_writer.count} local tasks to '{args.local_output}'.")
+
+    if gcs_writer is not None:
+        print(f"  - Wrote {gcs_writer.count} GCS tasks to '{args.gcs_output}'.")
     else:
         print("  - GCS export skipped. Set --gcs-bucket to generate cloud-backed tasks.")
 
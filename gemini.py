@@ -7,26 +7,47 @@ the JSON response, and writes both structured detections and annotated images.
 from __future__ import annotations
 
 import argparse
-import json
+import asyncio
+import hashlib
+import importlib.util
 import os
 import time
 from pathlib import Path
 from typing import Any
 
+import httpx
 from google import genai
 from google.genai import types
-from PIL import Image, ImageDraw
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import jsonio
 from config import (
+    ANNOTATED_IMAGE_FORMATS,
+    ANNOTATED_JPEG_QUALITY,
+    ANNOTATED_PNG_COMPRESS_LEVEL,
+    BATCH_PROMPT_TEMPLATE,
     BOX_COLOR,
-    DEFAULT_DELAY_SECONDS,
+    DEAD_LETTER_FILENAME,
+    DEFAULT_ANNOTATED_FORMAT,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CONCURRENCY,
     DEFAULT_INPUT_DIR,
+    DEFAULT_KEEPALIVE_SECONDS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAX_UPLOAD_EDGE,
     DEFAULT_MODEL,
     DEFAULT_OUTPUT_DIR,
     DEFAULT_PROMPT,
+    DEFAULT_REQUESTS_PER_MINUTE,
     SUPPORTED_EXTENSIONS,
     TEXT_COLOR,
 )
 
+LABEL_FONT = ImageFont.load_default()
+LABEL_OFFSET = 18
+UPLOAD_MODES = ("L", "LA", "RGB", "RGBA")
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -44,6 +65,31 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_OUTPUT_DIR,
         help=f"Directory for JSON and annotated images. Default: {DEFAULT_OUTPUT_DIR}",
     )
+    parser.add_argument(
+        "--annotated-format",
+        choices=sorted(ANNOTATED_IMAGE_FORMATS),
+        default=os.getenv("GEMINI_ANNOTATED_FORMAT", DEFAULT_ANNOTATED_FORMAT),
+        help=(
+            "Image format for annotated previews; png is lossless but much slower "
+            f"to encode and none skips previews. Default: {DEFAULT_ANNOTATED_FORMAT}"
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path(os.getenv("GEMINI_CACHE_DIR", DEFAULT_CACHE_DIR)),
+        help=f"Directory for cached Gemini responses. Default: {DEFAULT_CACHE_DIR}",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API and do not read or write the response cache.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reprocess images that already have a detection JSON in the output directory.",
+    )
     parser.add_argument(
         "--model",
         default=os.getenv("GEMINI_MODEL", DEFAULT_MODEL),
@@ -54,11 +100,55 @@ def parse_args() -> argparse.Namespace:
         default=os.getenv("GEMINI_PROMPT", DEFAULT_PROMPT),
         help="Detection prompt sent to Gemini.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("GEMINI_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        help=f"Maximum number of in-flight API calls. Default: {DEFAULT_CONCURRENCY}",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=int(os.getenv("GEMINI_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+        help=(
+            "Images sent together in one API request; each response is split "
+            f"back into per-image results. Default: {DEFAULT_BATCH_SIZE}"
+        ),
+    )
+    parser.add_argument(
+        "--max-upload-edge",
+        type=int,
+        default=int(os.getenv("GEMINI_MAX_UPLOAD_EDGE", DEFAULT_MAX_UPLOAD_EDGE)),
+        help=(
+            "Downscale images so their longest edge is at most this many pixels "
+            f"before upload; 0 sends full resolution. Default: {DEFAULT_MAX_UPLOAD_EDGE}"
+        ),
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=float(
+            os.getenv("GEMINI_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)
+        ),
+        help=(
+            "Token-bucket rate limit for API calls; 0 disables it. "
+            f"Default: {DEFAULT_REQUESTS_PER_MINUTE}"
+        ),
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=int(os.getenv("GEMINI_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+        help=(
+            "Retries with exponential backoff for 429 and 5xx responses. "
+            f"Default: {DEFAULT_MAX_RETRIES}"
+        ),
+    )
     parser.add_argument(
         "--delay",
         type=float,
-        default=float(os.getenv("GEMINI_REQUEST_DELAY", DEFAULT_DELAY_SECONDS)),
-        help=f"Delay between API calls in seconds. Default: {DEFAULT_DELAY_SECONDS}",
+        default=os.getenv("GEMINI_REQUEST_DELAY"),
+        help="Deprecated and ignored; use --requests-per-minute and --concurrency.",
     )
     return parser.parse_args()
 
@@ -67,15 +157,80 @@ def load_api_key() -> str | None:
     return os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 
 
-def list_image_files(input_dir: Path) -> list[Path]:
-    return sorted(
-        path
-        for path in input_dir.iterdir()
-        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+class RateLimiter:
+    """Async token bucket that allows bursts up to ``max_calls`` per ``period``."""
+
+    def __init__(self, max_calls: float, period: float) -> None:
+        # A bucket must hold at least one token or fractional rates never fire.
+        self.capacity = max(max_calls, 1.0)
+        self.refill_rate = max_calls / period
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                elapsed = now - self.updated_at
+                self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.refill_rate)
+
+
+class ProgressCounter:
+    """Counts finished images for the ``[done/total]`` progress lines."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+
+    def advance(self) -> str:
+        self.done += 1
+        return f"[{self.done}/{self.total}]"
+
+
+def build_client(api_key: str, max_retries: int, concurrency: int) -> genai.Client:
+    # The SDK retries 408/429/5xx responses with exponential backoff and jitter.
+    retry_options = types.HttpRetryOptions(attempts=max_retries + 1)
+    # Keep one warm connection per concurrent request so TCP and TLS setup is
+    # paid once per connection instead of once per image. HTTP/2 needs the
+    # optional h2 package.
+    async_client_args = {
+        "http2": importlib.util.find_spec("h2") is not None,
+        "limits": httpx.Limits(
+            max_keepalive_connections=concurrency,
+            keepalive_expiry=DEFAULT_KEEPALIVE_SECONDS,
+        ),
+    }
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            retry_options=retry_options,
+            async_client_args=async_client_args,
+        ),
     )
 
 
-def validate_detections(payload: Any, image_name: str) -> list[dict[str, Any]] | None:
+def list_image_files(input_dir: Path) -> list[Path]:
+    # DirEntry caches the file type from the directory read, so this avoids a
+    # separate stat call per entry.
+    with os.scandir(input_dir) as entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+            and entry.is_file()
+        )
+
+
+def validate_detections(
+    payload: Any, image_name: str
+) -> tuple[list[dict[str, Any]], np.ndarray] | None:
+    """Validate Gemini's response and return it with an (N, 4) array of its boxes."""
     if not isinstance(payload, list):
         print(f"  - !!! REJECTED: {image_name} returned non-list JSON.")
         return None
@@ -101,86 +256,376 @@ def validate_detections(payload: Any, image_name: str) -> list[dict[str, Any]] |
             )
             return None
 
-        ymin, xmin, ymax, xmax = box_coords
-        if not all(0 <= value <= 1000 for value in box_coords):
-            print(
-                f"  - !!! REJECTED: Detection #{index} in {image_name} is outside the 0-1000 range."
-            )
-            return None
-        if ymin >= ymax or xmin >= xmax:
-            print(
-                f"  - !!! REJECTED: Detection #{index} in {image_name} has inverted coordinates."
-            )
-            return None
-
-        validated.append({"label": label, "box_2d": [ymin, xmin, ymax, xmax]})
+        validated.append({"label": label, "box_2d": box_coords})
+
+    # Range and ordering checks run once over the whole array; the same array
+    # is reused for pixel scaling when the image is annotated.
+    boxes = np.array(
+        [detection["box_2d"] for detection in validated], dtype=np.float64
+    ).reshape(-1, 4)
+    # Written as "not inside" so NaN coordinates, which fail every
+    # comparison, are rejected too.
+    out_of_range = ~((boxes >= 0) & (boxes <= 1000)).all(axis=1)
+    if out_of_range.any():
+        index = int(out_of_range.argmax()) + 1
+        print(
+            f"  - !!! REJECTED: Detection #{index} in {image_name} is outside the 0-1000 range."
+        )
+        return None
+    inverted = (boxes[:, 0] >= boxes[:, 2]) | (boxes[:, 1] >= boxes[:, 3])
+    if inverted.any():
+        index = int(inverted.argmax()) + 1
+        print(
+            f"  - !!! REJECTED: Detection #{index} in {image_name} has inverted coordinates."
+        )
+        return None
 
-    return validated
+    return validated, boxes
 
 
 def annotate_and_save_image(
-    image: Image.Image, detections: list[dict[str, Any]], output_path: Path
+    image: Image.Image,
+    detections: list[dict[str, Any]],
+    boxes: np.ndarray,
+    output_path: Path,
 ) -> None:
-    annotated_image = image.copy()
-    draw = ImageDraw.Draw(annotated_image)
-    width, height = annotated_image.size
-
-    for detection in detections:
-        label = detection["label"]
-        y1_1000, x1_1000, y2_1000, x2_1000 = detection["box_2d"]
-        abs_y1 = int(y1_1000 / 1000 * height)
-        abs_x1 = int(x1_1000 / 1000 * width)
-        abs_y2 = int(y2_1000 / 1000 * height)
-        abs_x2 = int(x2_1000 / 1000 * width)
-
+    # Draws in place: callers pass an image they no longer need unannotated.
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+
+    # box_2d is [ymin, xmin, ymax, xmax] on a 0-1000 scale.
+    # All per-box arithmetic, including the label position just above each
+    # box, happens in NumPy so the loop below only issues draw calls.
+    scale = np.array([height, width, height, width], dtype=np.float64)
+    pixel_boxes = (boxes / 1000 * scale).astype(np.int32)
+    label_y = np.maximum(pixel_boxes[:, 0] - LABEL_OFFSET, 0)
+    rows = np.column_stack((pixel_boxes, label_y)).tolist()
+
+    for detection, (abs_y1, abs_x1, abs_y2, abs_x2, text_y) in zip(detections, rows):
         draw.rectangle([abs_x1, abs_y1, abs_x2, abs_y2], outline=BOX_COLOR, width=4)
-        draw.text((abs_x1, max(abs_y1 - 18, 0)), label, fill=TEXT_COLOR)
+        draw.text((abs_x1, text_y), detection["label"], fill=TEXT_COLOR, font=LABEL_FONT)
+
+    if output_path.suffix == ".png":
+        # Previews are throwaway; fast DEFLATE matters more than file size here.
+        image.save(output_path, "PNG", compress_level=ANNOTATED_PNG_COMPRESS_LEVEL)
+    else:
+        image.save(output_path, "JPEG", quality=ANNOTATED_JPEG_QUALITY)
+
+
+def decode_image(raw_image: Image.Image) -> Image.Image:
+    # Gemini accepts these modes as-is and LANCZOS can resample them, so the
+    # RGB conversion is deferred until an annotated preview is drawn.
+    if raw_image.mode in UPLOAD_MODES:
+        return raw_image.copy()
+    return raw_image.convert("RGB")
+
+
+def load_image(image_path: Path) -> Image.Image:
+    with Image.open(image_path) as raw_image:
+        return decode_image(raw_image)
+
+
+def downscale_for_upload(image: Image.Image, max_edge: int) -> Image.Image:
+    # Boxes come back on a 0-1000 scale, so a smaller upload does not change
+    # how they map onto the full-resolution image used for annotation.
+    if max_edge <= 0 or max(image.size) <= max_edge:
+        return image
+    upload_image = image.copy()
+    upload_image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    return upload_image
+
+
+def load_upload_image(
+    image_path: Path, max_edge: int
+) -> tuple[Image.Image, Image.Image | None]:
+    """Decode the image sent to Gemini.
+
+    Returns the upload image and, when it was decoded anyway, the
+    full-resolution image. Large JPEGs are decoded at a reduced DCT scale, so
+    their full-resolution pixels are only decoded later if annotation needs them.
+    """
+    with Image.open(image_path) as raw_image:
+        full_size = raw_image.size
+        if max_edge > 0:
+            # Only JPEG honours draft requests; other formats decode as usual.
+            raw_image.draft("RGB", (max_edge, max_edge))
+        reduced = raw_image.size != full_size
+        image = decode_image(raw_image)
+    return downscale_for_upload(image, max_edge), None if reduced else image
+
+
+def response_cache_key(
+    image_path: Path, model: str, prompt: str, max_upload_edge: int, batch_size: int
+) -> str:
+    # Everything that changes the request is part of the key, so editing the
+    # prompt, switching models, or batching images (which wraps the prompt in
+    # BATCH_PROMPT_TEMPLATE) never serves stale detections.
+    digest = hashlib.blake2b(image_path.read_bytes(), digest_size=20)
+    for part in (model, prompt, str(max_upload_edge), str(batch_size)):
+        digest.update(b"\0" + part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_cached_response(cache_path: Path) -> Any | None:
+    try:
+        return jsonio.loads(cache_path.read_bytes())
+    except (FileNotFoundError, jsonio.JSONDecodeError):
+        return None
 
-    annotated_image.save(output_path)
 
+def list_completed_stems(output_dir: Path) -> set[str]:
+    # A detection JSON is only written once an image is fully processed, so
+    # its presence marks the image as done.
+    if not output_dir.is_dir():
+        return set()
+    with os.scandir(output_dir) as entries:
+        return {
+            entry.name[: -len(".json")]
+            for entry in entries
+            if entry.name.endswith(".json") and entry.is_file()
+        }
+
+
+def record_failure(output_dir: Path, image_paths: list[Path], reason: str) -> None:
+    # One tab-separated line per image; collapse whitespace so multi-line
+    # error messages stay on a single line.
+    reason = " ".join(reason.split())
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with (output_dir / DEAD_LETTER_FILENAME).open("a", encoding="utf-8") as dead_letter:
+        for image_path in image_paths:
+            dead_letter.write(f"{image_path}\t{reason}\n")
+
+
+def build_contents(upload_images: list[Image.Image], prompt: str) -> list[Any]:
+    if len(upload_images) == 1:
+        return [upload_images[0], prompt]
+
+    contents: list[Any] = []
+    for index, upload_image in enumerate(upload_images):
+        contents.extend([f"Image {index}:", upload_image])
+    contents.append(
+        BATCH_PROMPT_TEMPLATE.format(
+            count=len(upload_images), last=len(upload_images) - 1, prompt=prompt
+        )
+    )
+    return contents
 
-def process_image(
-    image_path: Path,
+
+def split_batch_payload(
+    payload: Any, image_paths: list[Path], batch_name: str
+) -> list[Any] | None:
+    """Return the per-image payloads of a batched response in input order."""
+    count = len(image_paths)
+    if not isinstance(payload, list) or len(payload) != count:
+        print(f"  - !!! REJECTED: {batch_name} did not return a list of {count} results.")
+        return None
+
+    results: dict[int, Any] = {}
+    for entry in payload:
+        index = entry.get("image_index") if isinstance(entry, dict) else None
+        if not isinstance(index, int) or not 0 <= index < count or index in results:
+            print(
+                f"  - !!! REJECTED: {batch_name} returned a result with a missing, "
+                "duplicate, or out-of-range image_index."
+            )
+            return None
+        results[index] = entry.get("detections")
+    return [results[index] for index in range(count)]
+
+
+async def request_detections(
+    image_paths: list[Path],
     client: genai.Client,
-    output_dir: Path,
-    model: str,
-    prompt: str,
+    rate_limiter: RateLimiter | None,
+    args: argparse.Namespace,
+) -> tuple[Any, list[Image.Image | None]]:
+    """Send one request for ``image_paths`` and return the parsed response.
+
+    Also returns any full-resolution images decoded while preparing uploads.
+    """
+    loaded = await asyncio.gather(
+        *(
+            asyncio.to_thread(load_upload_image, image_path, args.max_upload_edge)
+            for image_path in image_paths
+        )
+    )
+    upload_images = [upload_image for upload_image, _ in loaded]
+
+    config = types.GenerateContentConfig(response_mime_type="application/json")
+    if rate_limiter is not None:
+        await rate_limiter.acquire()
+    response = await client.aio.models.generate_content(
+        model=args.model,
+        contents=build_contents(upload_images, args.prompt),
+        config=config,
+    )
+    if len(image_paths) == 1:
+        payload = jsonio.loads_detections(response.text)
+    else:
+        payload = jsonio.loads_batched_detections(response.text)
+    return payload, [image for _, image in loaded]
+
+
+async def save_detections(
+    image_path: Path,
+    payload: Any,
+    image: Image.Image | None,
+    cache_path: Path | None,
+    args: argparse.Namespace,
 ) -> None:
     image_name = image_path.name
-    output_json_path = output_dir / f"{image_path.stem}.json"
-    output_image_path = output_dir / f"{image_path.stem}_annotated.png"
+    annotated_suffix = ANNOTATED_IMAGE_FORMATS[args.annotated_format]
+    output_json_path = args.output_dir / f"{image_path.stem}.json"
+    output_image_path = (
+        None
+        if annotated_suffix is None
+        else args.output_dir / f"{image_path.stem}_annotated{annotated_suffix}"
+    )
 
     try:
-        with Image.open(image_path) as raw_image:
-            image = raw_image.convert("RGB") if raw_image.mode != "RGB" else raw_image.copy()
-
-        config = types.GenerateContentConfig(response_mime_type="application/json")
-        response = client.models.generate_content(
-            model=model,
-            contents=[image, prompt],
-            config=config,
-        )
-
-        detections = validate_detections(json.loads(response.text), image_name)
-        if detections is None:
+        validated = validate_detections(payload, image_name)
+        if validated is None:
+            await asyncio.to_thread(
+                record_failure, args.output_dir, [image_path], "invalid detections"
+            )
             return
+        detections, boxes = validated
+        if cache_path is not None:
+            await asyncio.to_thread(jsonio.write_atomic, cache_path, detections)
         if not detections:
+            # An empty JSON still checkpoints the image so resumed runs skip it.
+            await asyncio.to_thread(jsonio.write_atomic, output_json_path, detections)
             print(f"  - No detections in {image_name}.")
             return
 
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_json_path.write_text(
-            json.dumps(detections, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
-        annotate_and_save_image(image, detections, output_image_path)
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+        if output_image_path is not None:
+            if image is None:
+                image = await asyncio.to_thread(load_image, image_path)
+            await asyncio.to_thread(
+                annotate_and_save_image, image, detections, boxes, output_image_path
+            )
+        # The JSON is written last: it is the checkpoint that marks this image
+        # as done for later runs.
+        await asyncio.to_thread(jsonio.write_atomic, output_json_path, detections)
 
         print(f"  - ✓ JSON saved to {output_json_path}")
-        print(f"  - ✓ Annotated image saved to {output_image_path}")
-    except json.JSONDecodeError as exc:
-        print(f"  - !!! Failed to parse JSON for {image_name}: {exc}")
+        if output_image_path is not None:
+            print(f"  - ✓ Annotated image saved to {output_image_path}")
     except Exception as exc:
         print(f"  - !!! An error occurred while processing {image_name}: {exc}")
+        await asyncio.to_thread(
+            record_failure, args.output_dir, [image_path], f"error: {exc}"
+        )
+
+
+async def process_batch(
+    image_paths: list[Path],
+    client: genai.Client,
+    semaphore: asyncio.Semaphore,
+    rate_limiter: RateLimiter | None,
+    progress: ProgressCounter,
+    args: argparse.Namespace,
+) -> None:
+    batch_name = ", ".join(image_path.name for image_path in image_paths)
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    async with semaphore:
+        print(f"  - Processing {batch_name}...")
+        payloads: dict[Path, Any] = {}
+        images: dict[Path, Image.Image | None] = {}
+        cache_paths: dict[Path, Path] = {}
+        if cache_dir is not None:
+            for image_path in image_paths:
+                try:
+                    cache_key = await asyncio.to_thread(
+                        response_cache_key,
+                        image_path,
+                        args.model,
+                        args.prompt,
+                        args.max_upload_edge,
+                        args.batch_size,
+                    )
+                except OSError:
+                    # Unreadable files fail, and are recorded, in the request below.
+                    continue
+                cache_paths[image_path] = cache_dir / f"{cache_key}.json"
+                payload = await asyncio.to_thread(
+                    read_cached_response, cache_paths[image_path]
+                )
+                if payload is not None:
+                    print(f"  - Using cached response for {image_path.name}.")
+                    payloads[image_path] = payload
+
+        misses = [image_path for image_path in image_paths if image_path not in payloads]
+        if misses:
+            miss_name = ", ".join(image_path.name for image_path in misses)
+            try:
+                payload, decoded = await request_detections(
+                    misses, client, rate_limiter, args
+                )
+                if len(misses) == 1:
+                    requested = [payload]
+                else:
+                    requested = split_batch_payload(payload, misses, miss_name)
+                if requested is None:
+                    await asyncio.to_thread(
+                        record_failure,
+                        args.output_dir,
+                        misses,
+                        "invalid batched response",
+                    )
+                else:
+                    payloads.update(zip(misses, requested))
+                    images.update(zip(misses, decoded))
+            except jsonio.JSONDecodeError as exc:
+                print(f"  - !!! Failed to parse JSON for {miss_name}: {exc}")
+                await asyncio.to_thread(
+                    record_failure, args.output_dir, misses, f"invalid JSON: {exc}"
+                )
+            except Exception as exc:
+                print(f"  - !!! An error occurred while processing {miss_name}: {exc}")
+                await asyncio.to_thread(
+                    record_failure, args.output_dir, misses, f"error: {exc}"
+                )
+
+        for image_path in image_paths:
+            if image_path in payloads:
+                # Only fresh API responses are written back to the cache.
+                await save_detections(
+                    image_path,
+                    payloads[image_path],
+                    images.get(image_path),
+                    cache_paths.get(image_path) if image_path in images else None,
+                    args,
+                )
+            print(f"{progress.advance()} Finished: {image_path.name}")
+
+
+async def process_images(
+    image_files: list[Path], client: genai.Client, args: argparse.Namespace
+) -> None:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rate_limiter = (
+        RateLimiter(args.requests_per_minute, 60.0)
+        if args.requests_per_minute > 0
+        else None
+    )
+    progress = ProgressCounter(len(image_files))
+    tasks = [
+        process_batch(
+            image_files[start : start + args.batch_size],
+            client,
+            semaphore,
+            rate_limiter,
+            progress,
+            args,
+        )
+        for start in range(0, len(image_files), args.batch_size)
+    ]
+    await asyncio.gather(*tasks)
 
 
 def main() -> int:
@@ -193,31 +638,61 @@ def main() -> int:
     if not args.input_dir.is_dir():
         print(f"Error: input directory '{args.input_dir}' was not found.")
         return 1
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1.")
+        return 1
+    if args.annotated_format not in ANNOTATED_IMAGE_FORMATS:
+        # argparse does not check environment-variable defaults against choices.
+        print(f"Error: unsupported annotated image format '{args.annotated_format}'.")
+        return 1
+    if args.batch_size < 1:
+        print("Error: --batch-size must be at least 1.")
+        return 1
+    if args.max_upload_edge < 0:
+        print("Error: --max-upload-edge cannot be negative.")
+        return 1
+    if args.requests_per_minute < 0:
+        print("Error: --requests-per-minute cannot be negative.")
+        return 1
+    if args.max_retries < 0:
+        print("Error: --max-retries cannot be negative.")
+        return 1
+    if args.delay is not None:
+        print(
+            "Warning: --delay and GEMINI_REQUEST_DELAY are ignored; pace API calls "
+            "with --requests-per-minute and --concurrency instead."
+        )
 
     image_files = list_image_files(args.input_dir)
     if not image_files:
         print(f"No supported images found in '{args.input_dir}'.")
         return 0
 
-    client = genai.Client(api_key=api_key)
+    skipped = 0
+    if not args.force:
+        completed = list_completed_stems(args.output_dir)
+        pending = [path for path in image_files if path.stem not in completed]
+        skipped = len(image_files) - len(pending)
+        image_files = pending
+
+    client = build_client(api_key, args.max_retries, args.concurrency)
 
     print("--- Starting Batch Image Detection ---")
     print(f"Input directory: '{args.input_dir}'")
     print(f"Output directory: '{args.output_dir}'")
     print(f"Model: '{args.model}'")
+    print(f"Concurrency: {args.concurrency}")
+    if args.batch_size > 1:
+        print(f"Batch size: {args.batch_size} images per request")
+    if args.requests_per_minute > 0:
+        print(f"Rate limit: {args.requests_per_minute:g} requests/minute")
+    if not args.no_cache:
+        print(f"Response cache: '{args.cache_dir}'")
+    if skipped:
+        print(f"Skipping {skipped} images that already have results (use --force to redo).")
     print(f"Found {len(image_files)} images to process.")
 
-    for index, image_path in enumerate(image_files, start=1):
-        print(f"\n[{index}/{len(image_files)}] Processing: {image_path.name}")
-        process_image(
-            image_path=image_path,
-            client=client,
-            output_dir=args.output_dir,
-            model=args.model,
-            prompt=args.prompt,
-        )
-        if args.delay > 0 and index < len(image_files):
-            time.sleep(args.delay)
+    asyncio.run(process_images(image_files, client, args))
 
     print("\n--- Batch processing complete! ---")
     return 0
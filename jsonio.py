@@ -0,0 +1,199 @@
+"""JSON helpers shared by the pipeline scripts.
+
+``orjson`` is used when it is installed; otherwise the standard library
+``json`` module is used with equivalent output formatting. Detection payloads
+are parsed with ``pysimdjson`` when it is available.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+DETECTION_KEYS = ("label", "box_2d")
+
+_thread_state = threading.local()
+
+# Read once at import: os.umask() can only be queried by setting it, which is
+# not safe once worker threads may be creating files.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can catch
+# this single type regardless of which backend is active.
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize ``payload`` as UTF-8 JSON indented by two spaces."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+    return json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def create_temp_file(path: Path) -> IO[bytes]:
+    """Open a temporary file next to ``path`` for a later ``os.replace``.
+
+    NamedTemporaryFile creates files as 0600; the mode is reset to what
+    ``open()`` would give so the replaced file stays readable by other users.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+    os.chmod(temp_file.name, 0o666 & ~_UMASK)
+    return temp_file
+
+
+def write_atomic(path: Path, payload: Any) -> None:
+    """Write ``payload`` like :func:`dumps`, replacing ``path`` in one step.
+
+    An interrupted or failed write never leaves a truncated file at ``path``
+    and never leaves the temporary file behind.
+    """
+    temp_file = create_temp_file(path)
+    try:
+        with temp_file:
+            temp_file.write(dumps(payload))
+        os.replace(temp_file.name, path)
+    except BaseException:
+        os.remove(temp_file.name)
+        raise
+
+
+class JsonArrayWriter:
+    """Stream items into a JSON array file without keeping them in memory.
+
+    The file has the same layout as ``dumps`` applied to the full list. Items
+    go to a temporary file that only replaces ``path`` once the ``with`` block
+    finishes without an error, so a failed run keeps the previous file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = 0
+        self._file: IO[bytes]
+
+    def __enter__(self) -> JsonArrayWriter:
+        self._file = create_temp_file(self.path)
+        self._file.write(b"[")
+        return self
+
+    def write(self, item: Any) -> None:
+        separator = b"\n  " if self.count == 0 else b",\n  "
+        # JSON strings cannot contain raw newlines, so this only re-indents.
+        self._file.write(separator + dumps(item).replace(b"\n", b"\n  "))
+        self.count += 1
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            if exc_type is None:
+                self._file.write(b"\n]" if self.count else b"]")
+        finally:
+            self._file.close()
+
+        if exc_type is None:
+            os.replace(self._file.name, self.path)
+        else:
+            os.remove(self._file.name)
+
+
+def _simdjson_parser() -> Any:
+    # simdjson parsers are not thread-safe, so each thread reuses its own.
+    parser = getattr(_thread_state, "simdjson_parser", None)
+    if parser is None:
+        parser = _thread_state.simdjson_parser = simdjson.Parser()
+    return parser
+
+
+def _materialize(value: Any) -> Any:
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    return value
+
+
+def _parse(data: bytes | str) -> Any:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        return _simdjson_parser().parse(data)
+    except ValueError as exc:
+        raise JSONDecodeError(str(exc), "", 0) from exc
+
+
+def _select(value: Any, keys: tuple[str, ...]) -> Any:
+    """Materialize an array, keeping only ``keys`` from each object in it."""
+    if not isinstance(value, simdjson.Array):
+        return _materialize(value)
+
+    selected: list[Any] = []
+    for item in value:
+        if isinstance(item, simdjson.Object):
+            selected.append({key: _materialize(item[key]) for key in keys if key in item})
+        else:
+            selected.append(_materialize(item))
+    return selected
+
+
+def loads_detections(data: bytes | str) -> Any:
+    """Parse a detection payload, keeping only ``label`` and ``box_2d``.
+
+    With ``pysimdjson`` installed, detection objects are navigated lazily so
+    unused fields are never converted into Python objects. Without it this is
+    equivalent to :func:`loads`.
+    """
+    if simdjson is None:
+        return loads(data)
+    return _select(_parse(data), DETECTION_KEYS)
+
+
+def loads_batched_detections(data: bytes | str) -> Any:
+    """Parse a batched payload of ``image_index``/``detections`` objects.
+
+    Each nested detection list is trimmed like :func:`loads_detections`.
+    """
+    if simdjson is None:
+        return loads(data)
+
+    document = _parse(data)
+    if not isinstance(document, simdjson.Array):
+        return _materialize(document)
+
+    payload: list[Any] = []
+    for entry in document:
+        if not isinstance(entry, simdjson.Object):
+            payload.append(_materialize(entry))
+            continue
+        result: dict[str, Any] = {}
+        if "image_index" in entry:
+            result["image_index"] = _materialize(entry["image_index"])
+        if "detections" in entry:
+            result["detections"] = _select(entry["detections"], DETECTION_KEYS)
+        payload.append(result)
+    return payload